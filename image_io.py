@@ -0,0 +1,28 @@
+"""
+Image decoding shared by train_model.py (cache building) and predict.py (inference).
+
+Training and inference must produce identical uint8 arrays for the same file, so
+the decode, draft and resize steps live only here.
+"""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+from PIL import Image
+
+IMAGE_SIZE: Tuple[int, int] = (224, 224)
+
+
+def decode_resized_image(image_path: str, size: Tuple[int, int] = IMAGE_SIZE) -> np.ndarray:
+    """Decode an image file into a ``size`` RGB uint8 HWC array."""
+    image = Image.open(image_path)
+    # Let libjpeg downscale during DCT decode; the final resize is then cheap.
+    image.draft("RGB", size)
+    # Convert grayscale to RGB
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    # Pillow (SIMD) box-filter resize.
+    image = image.resize(size, Image.BOX)
+    return np.asarray(image, dtype=np.uint8)
@@ -3,22 +3,43 @@ Inference script for NeuroVision AI brain tumor classifier.
 
 Usage:
     python predict.py --image path/to/image.jpg
+    python predict.py --image-dir path/to/images/ --batch-size 32
 """
 
 from __future__ import annotations
 
 import argparse
+import glob
+import json
 import os
-from typing import List
+from functools import partial
+from typing import Any, Callable, Dict, List, Sequence, Tuple
 
 import numpy as np
 import torch
-from PIL import Image
+from torch.utils.data import DataLoader, Dataset
 
 from monai.networks.nets import EfficientNetBN
-from monai.transforms import Compose, EnsureChannelFirst, EnsureType, NormalizeIntensity, Resize
+
+from image_io import decode_resized_image
 
 DEFAULT_CLASS_NAMES: List[str] = ["glioma", "meningioma", "pituitary", "no_tumor"]
+IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png"})
+
+
+class ImageFileDataset(Dataset):
+    """Loads and preprocesses image files so a DataLoader can batch them."""
+
+    def __init__(self, image_paths: Sequence[str], transform: Callable) -> None:
+        self.image_paths = list(image_paths)
+        self.transform = transform
+
+    def __len__(self) -> int:
+        return len(self.image_paths)
+
+    def __getitem__(self, idx: int) -> Tuple[torch.Tensor, str]:
+        image_path = self.image_paths[idx]
+        return self.transform(load_image(image_path)), image_path
 
 
 def build_model(num_classes: int) -> EfficientNetBN:
@@ -30,15 +51,159 @@ def build_model(num_classes: int) -> EfficientNetBN:
     )
 
 
-def get_inference_transforms() -> Compose:
-    return Compose(
-        [
-            EnsureChannelFirst(channel_dim=-1),
-            Resize(spatial_size=(224, 224)),
-            NormalizeIntensity(nonzero=True, channel_wise=True),
-            EnsureType(dtype=torch.float32),
-        ]
-    )
+def preprocess_image(
+    image_np: np.ndarray, mean: torch.Tensor | None, std: torch.Tensor | None
+) -> torch.Tensor:
+    """Turn a 224x224 HWC uint8 image into a normalized float32 CHW tensor.
+
+    Transpose and float cast happen in a single copy, normalization in place.
+    Without ``mean``/``std`` (older checkpoints) each channel is normalized by
+    the statistics of its nonzero pixels, as MONAI's NormalizeIntensity did.
+    """
+    tensor = torch.from_numpy(image_np.transpose(2, 0, 1).astype(np.float32))
+    if mean is not None and std is not None:
+        return tensor.sub_(mean).div_(std)
+
+    mask = tensor != 0
+    count = mask.sum(dim=(1, 2), keepdim=True).clamp_min(1)
+    channel_mean = (tensor * mask).sum(dim=(1, 2), keepdim=True) / count
+    centered = (tensor - channel_mean) * mask
+    channel_std = (centered.square().sum(dim=(1, 2), keepdim=True) / count).sqrt()
+    channel_std = torch.where(channel_std == 0, torch.ones_like(channel_std), channel_std)
+    return torch.where(mask, centered / channel_std, tensor)
+
+
+def get_inference_transforms(
+    normalization: Dict[str, List[float]] | None = None,
+) -> Callable[[np.ndarray], torch.Tensor]:
+    # A plain callable: MONAI Compose/Lambda would wrap outputs in MetaTensors.
+    mean = std = None
+    if normalization is not None:
+        mean = torch.tensor(normalization["mean"], dtype=torch.float32).view(3, 1, 1)
+        std = torch.tensor(normalization["std"], dtype=torch.float32).view(3, 1, 1)
+    return partial(preprocess_image, mean=mean, std=std)
+
+
+def load_metadata(model_path: str) -> Dict[str, Any] | None:
+    """Read the JSON metadata sidecar written by train_model.py, if present."""
+    metadata_path = os.path.splitext(model_path)[0] + ".json"
+    if not os.path.isfile(metadata_path):
+        return None
+    with open(metadata_path, encoding="utf-8") as metadata_file:
+        return json.load(metadata_file)
+
+
+def load_checkpoint(
+    model_path: str, device: torch.device
+) -> Tuple[Dict[str, torch.Tensor], Dict[str, Any]]:
+    """Load model weights and the JSON metadata sidecar written by train_model.py.
+
+    Older single-file checkpoints (weights and metadata in one dict) are still
+    accepted and keep their per-image normalization. A bare state dict requires
+    the sidecar: without its dataset statistics the predictions would be wrong.
+    """
+    state = torch.load(model_path, map_location=device, weights_only=True)
+    if "model_state_dict" in state:
+        metadata = {key: value for key, value in state.items() if key != "model_state_dict"}
+        return state["model_state_dict"], metadata
+
+    metadata_path = os.path.splitext(model_path)[0] + ".json"
+    metadata = load_metadata(model_path)
+    if metadata is None:
+        raise FileNotFoundError(
+            f"Metadata sidecar not found at {metadata_path}. "
+            "Copy it alongside the checkpoint; it holds the class names and "
+            "normalization statistics the model was trained with."
+        )
+    if metadata.get("normalization") is None:
+        raise ValueError(f"Metadata at {metadata_path} is missing 'normalization'.")
+    return state, metadata
+
+
+def traced_model_path(model_path: str, device: torch.device) -> str:
+    """Cache path for the traced model, keyed on device type and the checkpoint's size/mtime."""
+    stat = os.stat(model_path)
+    base = os.path.splitext(model_path)[0]
+    return f"{base}.{device.type}.{stat.st_size}-{stat.st_mtime_ns}.ts"
+
+
+def remove_stale_traces(model_path: str, device: torch.device, traced_path: str) -> None:
+    """Delete cached traces for earlier versions of the checkpoint on this device type."""
+    base = os.path.splitext(model_path)[0]
+    for stale_path in glob.glob(f"{glob.escape(base)}.{device.type}.*.ts"):
+        if os.path.abspath(stale_path) == os.path.abspath(traced_path):
+            continue
+        try:
+            os.remove(stale_path)
+        except OSError as error:
+            print(f"[WARN] Could not remove stale traced model {stale_path}: {error}")
+
+
+def trace_model(
+    state_dict: Dict[str, torch.Tensor],
+    num_classes: int,
+    device: torch.device,
+    model_path: str,
+    traced_path: str,
+) -> torch.jit.ScriptModule:
+    """Trace and freeze the eval model, caching it at ``traced_path`` when writable."""
+    model = build_model(num_classes=num_classes)
+    model.load_state_dict(state_dict)
+    model.to(device, memory_format=torch.channels_last)
+    model.eval()
+
+    example = torch.zeros(1, 3, 224, 224, device=device).to(memory_format=torch.channels_last)
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(model, example))
+
+    # Best effort: a read-only models/ directory must not break inference.
+    tmp_path = f"{traced_path}.tmp"
+    try:
+        with open(tmp_path, "wb") as traced_file:
+            torch.jit.save(traced, traced_file)
+        os.replace(tmp_path, traced_path)
+    except OSError as error:
+        print(f"[WARN] Could not cache traced model at {traced_path}: {error}")
+    else:
+        remove_stale_traces(model_path, device, traced_path)
+    return traced
+
+
+def load_cached_trace(traced_path: str, device: torch.device) -> torch.jit.ScriptModule | None:
+    """Load a cached frozen trace, or return None if it is missing or unreadable."""
+    if not os.path.isfile(traced_path):
+        return None
+    try:
+        return torch.jit.load(traced_path, map_location=device)
+    except (RuntimeError, OSError) as error:
+        print(f"[WARN] Rebuilding unreadable traced model cache {traced_path}: {error}")
+        return None
+
+
+def load_inference_model(
+    model_path: str, device: torch.device
+) -> Tuple[torch.jit.ScriptModule, Dict[str, Any]]:
+    """Return the optimized TorchScript model and checkpoint metadata.
+
+    A cached frozen trace matching the checkpoint is reused; the weights are only
+    deserialized when it has to be (re)built or no complete metadata sidecar exists.
+    """
+    traced_path = traced_model_path(model_path, device)
+    state_dict = None
+    metadata = load_metadata(model_path)
+    # Incomplete metadata goes through load_checkpoint, which validates it.
+    if not metadata or metadata.get("normalization") is None:
+        state_dict, metadata = load_checkpoint(model_path, device)
+
+    frozen = load_cached_trace(traced_path, device)
+    if frozen is None:
+        if state_dict is None:
+            state_dict, metadata = load_checkpoint(model_path, device)
+        class_names = metadata.get("class_names", DEFAULT_CLASS_NAMES)
+        frozen = trace_model(state_dict, len(class_names), device, model_path, traced_path)
+    # optimize_for_inference folds conv+BN(+activation) and prepacks MKLDNN weights,
+    # which do not survive save/load; so only the frozen graph is cached.
+    return torch.jit.optimize_for_inference(frozen), metadata
 
 
 def load_image(image_path: str) -> np.ndarray:
@@ -55,29 +220,47 @@ def load_image(image_path: str) -> np.ndarray:
                 f"Also tried: {alt_path}\n"
                 "Please check the file path and ensure the image exists."
             )
-    image = Image.open(image_path)
-    # Convert grayscale to RGB to match training pipeline
-    if image.mode != "RGB":
-        image = image.convert("RGB")
-    np_image = np.array(image)
-    image.close()
-    return np_image
+    # Shared with train_model.build_cache so inference sees the training pixels.
+    return decode_resized_image(image_path)
+
+
+def collect_image_paths(image_dir: str) -> List[str]:
+    """Return the sorted JPG/PNG files directly inside ``image_dir``."""
+    with os.scandir(image_dir) as entries:
+        image_paths = [
+            entry.path
+            for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file()
+        ]
+    if not image_paths:
+        raise FileNotFoundError(f"No JPG/PNG images found in {image_dir}")
+    return sorted(image_paths)
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Run inference with the trained brain tumor classifier."
     )
-    parser.add_argument(
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
         "--image",
-        required=True,
         help="Path to an input image (JPG/PNG).",
     )
+    source.add_argument(
+        "--image-dir",
+        help="Directory of JPG/PNG images to classify in batches.",
+    )
     parser.add_argument(
         "--model-path",
         default=os.path.join("models", "brain_tumor_classifier.pth"),
         help="Path to the saved model checkpoint (.pth).",
     )
+    parser.add_argument(
+        "--batch-size", type=int, default=32, help="Images per forward pass (--image-dir)."
+    )
+    parser.add_argument(
+        "--num-workers", type=int, default=4, help="DataLoader worker processes (--image-dir)."
+    )
     return parser.parse_args()
 
 
@@ -91,32 +274,44 @@ def main() -> None:
             "Train the model first with train_model.py."
         )
 
-    checkpoint = torch.load(args.model_path, map_location=device, weights_only=False)
-    class_names = checkpoint.get("class_names", DEFAULT_CLASS_NAMES)
-    model = build_model(num_classes=len(class_names))
-    model.load_state_dict(checkpoint["model_state_dict"])
-    model.to(device)
-    model.eval()
+    model, metadata = load_inference_model(args.model_path, device)
+    class_names = metadata.get("class_names", DEFAULT_CLASS_NAMES)
 
-    transforms = get_inference_transforms()
-    image_np = load_image(args.image)
-    tensor = transforms(image_np).unsqueeze(0).to(device)
+    transforms = get_inference_transforms(metadata.get("normalization"))
+    single_image = args.image is not None
+    image_paths = [args.image] if single_image else collect_image_paths(args.image_dir)
+    loader = DataLoader(
+        ImageFileDataset(image_paths, transforms),
+        batch_size=args.batch_size,
+        shuffle=False,
+        # Worker start-up costs more than decoding a single image.
+        num_workers=0 if single_image else args.num_workers,
+        pin_memory=device.type == "cuda",
+    )
 
-    with torch.no_grad():
-        logits = model(tensor)
-        probabilities = torch.softmax(logits, dim=1)
-        confidence, pred_idx = torch.max(probabilities, dim=1)
-
-    pred_idx = pred_idx.item()
-    confidence = confidence.item() * 100
-    logits_list = logits.squeeze(0).cpu().tolist()
-    probs_list = probabilities.squeeze(0).cpu().tolist()
-
-    predicted_class = class_names[pred_idx]
-    print(f"Predicted Class: {predicted_class}")
-    print(f"Confidence: {confidence:.2f}%")
-    print(f"Raw Logits: {logits_list}")
-    print(f"Softmax Probabilities: {probs_list}")
+    for batch, batch_paths in loader:
+        batch = batch.to(device, memory_format=torch.channels_last, non_blocking=True)
+        with torch.inference_mode():
+            logits = model(batch)
+
+        # Single device-to-host copy per batch; softmax/argmax on a few floats is
+        # cheaper on the CPU than the extra syncs.
+        logits_np = logits.float().cpu().numpy()
+        probs_np = np.exp(logits_np - logits_np.max(axis=1, keepdims=True))
+        probs_np /= probs_np.sum(axis=1, keepdims=True)
+        pred_indices = probs_np.argmax(axis=1).tolist()
+        for image_path, pred_idx, logits_list, probs_list in zip(
+            batch_paths, pred_indices, logits_np.tolist(), probs_np.tolist()
+        ):
+            predicted_class = class_names[pred_idx]
+            confidence = probs_list[pred_idx] * 100
+            if not single_image:
+                print(f"{image_path}: {predicted_class} ({confidence:.2f}%)")
+                continue
+            print(f"Predicted Class: {predicted_class}")
+            print(f"Confidence: {confidence:.2f}%")
+            print(f"Raw Logits: {logits_list}")
+            print(f"Softmax Probabilities: {probs_list}")
 
 
 if __name__ == "__main__":